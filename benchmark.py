@@ -0,0 +1,253 @@
+# Course: CS261 - Data Structures
+# Description: This file includes a benchmark of the graph classes on synthetic graphs.
+#
+# Usage: python benchmark.py --sizes 100 1000 10000 --out bench.json [--baseline old.json]
+
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+
+from d_graph import DirectedGraph
+from ud_graph import UndirectedGraph
+
+
+# ------------------------------------------------------------------ #
+# seeded graph generators, all return a list of (u, v) with 0 <= u, v < n and u != v
+
+def erdos_renyi(n: int, rnd: random.Random, avg_degree: int = 4) -> []:
+    """
+    Return about n * avg_degree / 2 edges between uniformly random vertex pairs
+    """
+    edges = set()
+    target = min(n * avg_degree // 2, n * (n - 1) // 2)
+    while len(edges) < target:
+        u, v = rnd.randrange(n), rnd.randrange(n)
+        if u != v:
+            edges.add((u, v))
+    return sorted(edges)
+
+
+def power_law(n: int, rnd: random.Random, per_vertex: int = 2) -> []:
+    """
+    Return edges of a preferential attachment graph: every new vertex links to
+    per_vertex existing vertices picked proportionally to their degree. Edges point
+    from the older to the newer vertex, so in a directed graph vertex 0 reaches them all.
+    """
+    edges = []
+    ends = []
+    for v in range(1, n):
+        targets = {rnd.choice(ends) if ends else 0 for _ in range(min(per_vertex, v))}
+        for u in targets:
+            edges.append((u, v))
+            ends.extend((u, v))
+    return edges
+
+
+def grid(n: int, rnd: random.Random) -> []:
+    """
+    Return edges of a square grid with about n vertices (rnd is unused)
+    """
+    side = max(1, math.isqrt(n))
+    edges = []
+    for r in range(side):
+        for c in range(side):
+            v = r * side + c
+            if c + 1 < side:
+                edges.append((v, v + 1))
+            if r + 1 < side:
+                edges.append((v, v + side))
+    return edges
+
+
+def dag(n: int, rnd: random.Random, avg_degree: int = 4) -> []:
+    """
+    Return random edges that all go from a lower to a higher vertex (no cycles)
+    """
+    edges = set()
+    target = min(n * avg_degree // 2, n * (n - 1) // 2)
+    while len(edges) < target:
+        u, v = rnd.randrange(n), rnd.randrange(n)
+        if u != v:
+            edges.add((min(u, v), max(u, v)))
+    return sorted(edges)
+
+
+GENERATORS = {'erdos_renyi': erdos_renyi, 'power_law': power_law, 'grid': grid, 'dag': dag}
+
+
+# ------------------------------------------------------------------ #
+
+def timed(fn) -> float:
+    """
+    Return seconds taken by fn()
+    """
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def bench_directed(n: int, edges: [], rnd: random.Random, storage: str) -> dict:
+    """
+    Return {operation: seconds} for DirectedGraph on the given edges
+    """
+    weighted = [(u, v, rnd.randint(1, 100)) for u, v in edges]
+    times = {}
+    g = DirectedGraph.with_storage(storage)
+
+    def add_vertices():
+        for _ in range(n):
+            g.add_vertex()
+
+    def add_edges():
+        for u, v, w in weighted:
+            g.add_edge(u, v, w)
+
+    times['add_vertex'] = timed(add_vertices)
+    times['add_edge'] = timed(add_edges)
+    times['get_edges'] = timed(g.get_edges)
+    times['dfs'] = timed(lambda: g.dfs(0))
+    times['bfs'] = timed(lambda: g.bfs(0))
+    times['has_cycle'] = timed(g.has_cycle)
+    times['dijkstra'] = timed(lambda: g.dijkstra(0))
+    return times
+
+
+def bench_undirected(n: int, edges: [], rnd: random.Random) -> dict:
+    """
+    Return {operation: seconds} for UndirectedGraph on the given edges
+    """
+    named = [(str(u), str(v)) for u, v in edges]
+    doomed = [str(v) for v in rnd.sample(range(n), max(1, n // 10))]
+    times = {}
+    g = UndirectedGraph()
+
+    def add_vertices():
+        for v in range(n):
+            g.add_vertex(str(v))
+
+    def add_edges():
+        for u, v in named:
+            g.add_edge(u, v)
+
+    def remove_vertices():
+        for v in doomed:
+            g.remove_vertex(v)
+
+    times['add_vertex'] = timed(add_vertices)
+    times['add_edge'] = timed(add_edges)
+    times['get_edges'] = timed(g.get_edges)
+    times['dfs'] = timed(lambda: g.dfs('0'))
+    times['bfs'] = timed(lambda: g.bfs('0'))
+    # removals and bulk loads leave connectivity to be recomputed by the next query
+    times['remove_vertex'] = timed(remove_vertices)
+    times['has_cycle'] = timed(g.has_cycle)
+    g = UndirectedGraph.from_edges(named)
+    times['count_connected_components'] = timed(g.count_connected_components)
+    return times
+
+
+def scaling_exponent(points: []) -> float:
+    """
+    Return least-squares slope of log(seconds) over log(n) for [(n, seconds)]
+    """
+    points = [(math.log(n), math.log(max(t, 1e-9))) for n, t in points]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    var = sum((x - mean_x) ** 2 for x, _ in points)
+    if var == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var
+
+
+def run(sizes: [], generators: [], seed: int, repeat: int, storage: str, dense_limit: int) -> dict:
+    """
+    Run every benchmark and return the JSON report
+    """
+    results = []
+    for name in generators:
+        for n in sizes:
+            # one graph per size, so the repeats below time the same graph
+            edges = GENERATORS[name](n, random.Random(f'{seed}/{name}/{n}'))
+            for kind in ('directed', 'undirected'):
+                # list and compact storage are a full V x V matrix
+                if kind == 'directed' and storage in ('list', 'compact') and n > dense_limit:
+                    continue
+                best = {}
+                for _ in range(repeat):
+                    # same weights and removed vertices on every repeat as well
+                    rnd = random.Random(f'{seed}/{name}/{n}/{kind}')
+                    if kind == 'directed':
+                        times = bench_directed(n, edges, rnd, storage)
+                    else:
+                        times = bench_undirected(n, edges, rnd)
+                    for op, seconds in times.items():
+                        best[op] = min(seconds, best.get(op, seconds))
+                for op, seconds in best.items():
+                    results.append({'graph': kind, 'generator': name, 'op': op,
+                                    'n': n, 'm': len(edges), 'seconds': seconds})
+                print(f'{kind:10} {name:12} n={n:<8} done', file=sys.stderr)
+
+    series = {}
+    for row in results:
+        series.setdefault(f"{row['graph']}/{row['generator']}/{row['op']}", []).append((row['n'], row['seconds']))
+    exponents = {key: scaling_exponent(points) for key, points in sorted(series.items())}
+    return {
+        'meta': {'python': platform.python_version(), 'platform': platform.platform(), 'seed': seed,
+                 'sizes': sizes, 'repeat': repeat, 'storage': storage},
+        'results': results,
+        'exponents': exponents,
+    }
+
+
+def regressions(report: dict, baseline: dict, tolerance: float) -> []:
+    """
+    Return list of 'key: old -> new' for scaling exponents that grew by more than tolerance
+    """
+    found = []
+    for key, new in report['exponents'].items():
+        old = baseline.get('exponents', {}).get(key)
+        if old is not None and new is not None and new > old + tolerance:
+            found.append(f'{key}: {old:.2f} -> {new:.2f}')
+    return found
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark DirectedGraph and UndirectedGraph.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--generators', nargs='+', choices=sorted(GENERATORS), default=sorted(GENERATORS))
+    parser.add_argument('--seed', type=int, default=261)
+    parser.add_argument('--repeat', type=int, default=3, help='runs per size, the fastest is kept')
+    parser.add_argument('--storage', default='sparse', help='DirectedGraph storage (see graph_storage)')
+    parser.add_argument('--dense-limit', type=int, default=5000,
+                        help='largest n benchmarked with list or compact storage (V x V matrix)')
+    parser.add_argument('--out', default='-', help='JSON output file (default: stdout)')
+    parser.add_argument('--baseline', help='earlier JSON report to compare scaling exponents with')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed growth of a scaling exponent over the baseline')
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.generators, args.seed, args.repeat, args.storage, args.dense_limit)
+    text = json.dumps(report, indent=2)
+    if args.out == '-':
+        print(text)
+    else:
+        with open(args.out, 'w') as f:
+            f.write(text + '\n')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(report, json.load(f), args.tolerance)
+        for line in found:
+            print(f'REGRESSION {line}', file=sys.stderr)
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
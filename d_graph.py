@@ -5,7 +5,119 @@
 
 import collections
 import heapq
+import os
+import sys
+import tempfile
+import warnings
+from array import array
 from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import instrumentation
+from graph_storage import CSRMatrix, CompactMatrix, create_storage, out_edges, storage_nbytes
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional
+    np = None
+
+class PathCache:
+    """
+    LRU cache of dijkstra() results per source vertex
+    - size is bounded by an approximate number of bytes
+    - all entries are dropped when the graph version changes
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()
+        self.version = None
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, src: int, version: int):
+        """
+        Return cached (dist, parent) of src for this graph version, or None
+        """
+        if version != self.version:
+            self.invalidations += len(self.entries)
+            self.entries.clear()
+            self.bytes = 0
+            self.version = version
+        entry = self.entries.get(src)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(src)
+        self.hits += 1
+        return entry[0], entry[1]
+
+    def put(self, src: int, version: int, result) -> None:
+        """
+        Store (dist, parent) of src, evicting least recently used entries to stay under max_bytes
+        """
+        if version != self.version:
+            return
+        dist, parent = tuple(result[0]), tuple(result[1])
+        # tuples plus roughly one boxed number per distance
+        size = sys.getsizeof(dist) + sys.getsizeof(parent) + 32 * len(dist)
+        if size > self.max_bytes:
+            return
+        self.entries[src] = (dist, parent, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, _, evicted) = self.entries.popitem(last=False)
+            self.bytes -= evicted
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'invalidations': self.invalidations, 'entries': len(self.entries),
+                'bytes': self.bytes, 'max_bytes': self.max_bytes}
+
+
+class Batch:
+    """
+    Changes collected by graph.batch(), applied in one pass with apply_batch()
+    when the with block ends without an exception
+    - each change is checked against the graph's operations as it is recorded
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.ops = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.graph.apply_batch(self.ops)
+        self.ops = []
+
+    def add_vertex(self, *args) -> None:
+        self._record(('add_vertex',) + args)
+
+    def add_edge(self, *args) -> None:
+        self._record(('add_edge',) + args)
+
+    def remove_edge(self, *args) -> None:
+        self._record(('remove_edge',) + args)
+
+    def remove_vertex(self, *args) -> None:
+        self._record(('remove_vertex',) + args)
+
+    def _record(self, op) -> None:
+        """
+        Queue op, raising ValueError right away if the graph does not support it
+        """
+        if len(op) not in self.graph._BATCH_OPS.get(op[0], ()):
+            raise ValueError(f'invalid batch operation: {op!r}')
+        self.ops.append(op)
+
 
 class DirectedGraph:
     """
@@ -16,6 +128,22 @@ class DirectedGraph:
     - vertex names are integers
     """
 
+    # number of edges, kept up to date by add_edge/remove_edge;
+    # None when it has to be recounted (after bulk changes)
+    _edge_count = 0
+    # bumped on every change, see version
+    _version = 0
+    # PathCache of dijkstra() results, see enable_path_cache()
+    _path_cache = None
+    # (version, in-edges per vertex) used by shortest_path()
+    _reverse_cache = None
+    # list storage: bytearray flagging rows shared with a snapshot (None if no row is shared)
+    _shared_rows = None
+    # True for snapshots, see snapshot()
+    _read_only = False
+    # apply_batch() operations and their allowed tuple lengths
+    _BATCH_OPS = {'add_vertex': (1,), 'add_edge': (3, 4), 'remove_edge': (3,)}
+
     def __init__(self, start_edges=None):
         """
         Store graph info as adjacency matrix
@@ -54,35 +182,237 @@ class DirectedGraph:
 
     # ------------------------------------------------------------------ #
 
+    @classmethod
+    def with_storage(cls, storage, start_edges=None):
+        """
+        Return new graph whose adjacency matrix uses the given storage
+        ('list', 'compact' or 'sparse', see graph_storage) populated with start_edges
+        """
+        graph = cls()
+        graph.adj_matrix = create_storage(storage)
+        if start_edges is not None:
+            v_count = 0
+            for u, v, _ in start_edges:
+                v_count = max(v_count, u, v)
+            graph.add_vertices(v_count + 1)
+            for u, v, weight in start_edges:
+                graph.add_edge(u, v, weight)
+        return graph
+
+    @classmethod
+    def from_edges(cls, edges, assume_unique=None, vertex_count=None, storage='list'):
+        """
+        Return new graph built from an iterable of (src, dst, weight) edges in bulk.
+        - vertex_count: number of vertices; if omitted the edges are read once to find it
+        - assume_unique: deprecated and ignored, see add_edges()
+        """
+        if assume_unique is not None:
+            warnings.warn('assume_unique is deprecated and ignored: repeated edges are merged '
+                          'at no extra cost and edges are always validated',
+                          DeprecationWarning, stacklevel=2)
+        if vertex_count is None:
+            edges = list(edges)
+            vertex_count = max((max(u, v) for u, v, _ in edges), default=-1) + 1
+        graph = cls.with_storage(storage)
+        graph.add_vertices(vertex_count)
+        graph.add_edges(edges)
+        return graph
+
     def add_vertex(self) -> int:
         """
         Add new vertex to the graph and returns the number of vertices in the graph after the addition.
+        Existing edges are kept.
+        """
+        return self.add_vertices(1)
+
+    def add_vertices(self, n: int) -> int:
+        """
+        Add n new vertices to the graph in a single resize and return the number of
+        vertices in the graph after the addition. Existing edges are kept.
         """
-        self.adj_matrix = [[0 for column in range(self.v_count + 1)] for row in range(self.v_count + 1)]
-        self.v_count += 1
+        self._check_writable()
+        if n <= 0:
+            return self.v_count
+        self._version += 1
+        if not isinstance(self.adj_matrix, list):
+            self.adj_matrix.grow(n)
+            self.v_count += n
+            return self.v_count
+        # 1. widen every existing row in place (list growth is amortized, so no full rebuild);
+        #    rows shared with a snapshot are copied instead
+        padding = [0] * n
+        shared = self._shared_rows
+        for i, row in enumerate(self.adj_matrix):
+            if shared is not None and shared[i]:
+                self.adj_matrix[i] = row + padding
+            else:
+                row.extend(padding)
+        self._shared_rows = None
+        # 2. append the new rows
+        size = self.v_count + n
+        for _ in range(n):
+            self.adj_matrix.append([0] * size)
+        self.v_count = size
         return self.v_count
 
     def add_edge(self, src: int, dst: int, weight=1) -> None:
         """
         Add edge to the graph. Duplicated elements not allowed.
         """
+        self._check_writable()
         if not (0 <= src < self.v_count and 0 <= dst < self.v_count):
             return
         elif weight < 0 or src == dst:
             return
         else:
-            self.adj_matrix[src][dst] = weight
+            row = self._row_for_write(src)
+            old = row[dst]
+            row[dst] = weight
+            self._version += 1
+            if self._edge_count is not None:
+                self._edge_count += int(weight != 0) - int(old != 0)
+
+    def add_edges(self, edges, assume_unique=None) -> None:
+        """
+        Add (src, dst, weight) edges from any iterable in one pass, writing straight to storage.
+        Invalid edges are skipped like in add_edge(); a repeated edge keeps the last weight.
+        assume_unique is deprecated and ignored: repeats cost nothing extra and the
+        range, loop and weight checks always run.
+        """
+        if assume_unique is not None:
+            warnings.warn('assume_unique is deprecated and ignored: repeated edges are merged '
+                          'at no extra cost and edges are always validated',
+                          DeprecationWarning, stacklevel=2)
+        self._check_writable()
+        matrix = self.adj_matrix
+        n = self.v_count
+        # recounted on next use
+        self._edge_count = None
+        self._version += 1
+        if isinstance(matrix, list) and self._shared_rows is None:
+            for src, dst, weight in edges:
+                if 0 <= src < n and 0 <= dst < n and src != dst and weight >= 0:
+                    matrix[src][dst] = weight
+            return
+
+        set_weight = self._weight_setter()
+        for src, dst, weight in edges:
+            if 0 <= src < n and 0 <= dst < n and src != dst and weight >= 0:
+                set_weight(src, dst, weight)
+
+    def apply_batch(self, ops) -> None:
+        """
+        Apply a sequence of changes in one pass, in order:
+        ('add_vertex',), ('add_edge', src, dst[, weight]), ('remove_edge', src, dst).
+        Invalid edges are skipped like in add_edge()/remove_edge(). Unknown operations
+        and operations of the wrong length raise ValueError before anything is changed.
+        The edge count is recounted once on next use.
+        """
+        self._check_writable()
+        ops = list(ops)
+        for op in ops:
+            if len(op) not in self._BATCH_OPS.get(op[0] if op else None, ()):
+                raise ValueError(f'invalid batch operation: {op!r}')
+
+        # 1. make room for all new vertices at once; edges only see a vertex after its add_vertex
+        n = self.v_count
+        self.add_vertices(sum(1 for op in ops if op[0] == 'add_vertex'))
+        self._edge_count = None
+        self._version += 1
+
+        # 2. write the edges straight to storage
+        set_weight = self._weight_setter()
+        for op in ops:
+            if op[0] == 'add_vertex':
+                n += 1
+            elif op[0] == 'add_edge':
+                src, dst = op[1], op[2]
+                weight = op[3] if len(op) > 3 else 1
+                if 0 <= src < n and 0 <= dst < n and src != dst and weight >= 0:
+                    set_weight(src, dst, weight)
+            elif 0 <= op[1] < n and 0 <= op[2] < n:
+                set_weight(op[1], op[2], 0)
+
+    def batch(self) -> Batch:
+        """
+        Return transaction collecting changes and applying them with apply_batch() on exit:
+            with graph.batch() as b:
+                b.add_edge(0, 1, 5)
+                b.remove_edge(1, 2)
+        Nothing is applied if the block raises.
+        """
+        return Batch(self)
+
+    def _weight_setter(self):
+        """
+        Return function(src, dst, weight) writing one edge weight to storage
+        """
+        matrix = self.adj_matrix
+        if not isinstance(matrix, list):
+            return matrix.set_weight
+        if self._shared_rows is None:
+            def set_weight(src, dst, weight):
+                matrix[src][dst] = weight
+        else:
+            def set_weight(src, dst, weight):
+                self._row_for_write(src)[dst] = weight
+        return set_weight
 
     def remove_edge(self, src: int, dst: int) -> None:
         """
         This method removes an edge between two vertices with provided indices.
         """
+        self._check_writable()
         if not (0 <= src < self.v_count and 0 <= dst < self.v_count):
             return
         elif self.adj_matrix[src][dst] == 0:
             return
         else:
-            self.adj_matrix[src][dst] = 0
+            self._row_for_write(src)[dst] = 0
+            self._version += 1
+            if self._edge_count is not None:
+                self._edge_count -= 1
+
+    def snapshot(self):
+        """
+        Return read-only copy of the graph that other threads can query without locks
+        while this graph keeps changing. Rows are shared with the snapshot and copied
+        here on their next change; a compact buffer is copied on its first change and
+        frozen storage is shared as is. Call it from the writer thread, not while
+        another change is running.
+        """
+        if self._read_only:
+            return self
+        snap = type(self)()
+        matrix = self.adj_matrix
+        if isinstance(matrix, list):
+            snap.adj_matrix = list(matrix)
+            self._shared_rows = bytearray(b'\x01') * len(matrix)
+        else:
+            snap.adj_matrix = matrix.snapshot()
+        snap.v_count = self.v_count
+        snap._edge_count = self._edge_count
+        snap._version = self._version
+        snap._reverse_cache = self._reverse_cache
+        snap._read_only = True
+        return snap
+
+    def _row_for_write(self, src: int):
+        """
+        Return row src of the adjacency matrix, copying it first if a snapshot shares it
+        """
+        if isinstance(self.adj_matrix, CompactMatrix):
+            # numpy rows are views into the buffer, so it is copied before handing one out
+            self.adj_matrix.unshare()
+        shared = self._shared_rows
+        if shared is not None and shared[src]:
+            self.adj_matrix[src] = list(self.adj_matrix[src])
+            shared[src] = 0
+        return self.adj_matrix[src]
+
+    def _check_writable(self) -> None:
+        if self._read_only:
+            raise TypeError('graph snapshot is read-only')
 
     def get_vertices(self) -> []:
         """
@@ -97,12 +427,69 @@ class DirectedGraph:
         """
         Return list of edges in the graph
         """
-        edges = []
-        for i in range(len(self.adj_matrix)):
-            for j in range(len(self.adj_matrix[i])):
-                if self.adj_matrix[i][j] != 0 and (i and j) >= 0:
-                    edges.append((i, j, self.adj_matrix[i][j]))
-        return edges
+        return list(self.iter_edges())
+
+    def iter_edges(self):
+        """
+        Yield (src, dst, weight) edges in the order of get_edges() without building a list
+        """
+        for i in range(self.v_count):
+            for j, weight in out_edges(self.adj_matrix, i):
+                yield i, j, weight
+
+    @property
+    def edge_count(self) -> int:
+        """
+        Return number of edges in the graph
+        """
+        if self._edge_count is None:
+            self._edge_count = sum(len(out_edges(self.adj_matrix, u)) for u in range(self.v_count))
+        return self._edge_count
+
+    def freeze(self) -> None:
+        """
+        Convert the adjacency matrix to read-only CSR arrays for read-heavy phases.
+        Edges cannot be added or removed until thaw() is called.
+        """
+        self._check_writable()
+        if not isinstance(self.adj_matrix, CSRMatrix):
+            self.adj_matrix = CSRMatrix.from_storage(self.adj_matrix)
+            self._shared_rows = None
+
+    def thaw(self) -> None:
+        """
+        Convert frozen CSR adjacency back to mutable sparse storage
+        """
+        self._check_writable()
+        if isinstance(self.adj_matrix, CSRMatrix):
+            self.adj_matrix = self.adj_matrix.thaw()
+
+    def save(self, path) -> None:
+        """
+        Write the graph to path as a binary snapshot (see graph_io)
+        """
+        from graph_io import save_graph
+        save_graph(self, path)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Return graph read from a snapshot written by save(). With mmap=True the graph
+        is frozen on top of a read-only memory map shared by every process loading the file.
+        """
+        from graph_io import load_graph
+        graph = load_graph(path, mmap)
+        if not isinstance(graph, cls):
+            raise TypeError(f'{path} does not contain a {cls.__name__}')
+        return graph
+
+    def bytes_per_vertex(self) -> float:
+        """
+        Return number of bytes used by the adjacency matrix per vertex
+        """
+        if self.v_count == 0:
+            return 0.0
+        return storage_nbytes(self.adj_matrix) / self.v_count
 
     def is_valid_path(self, path: []) -> bool:
         """
@@ -123,33 +510,12 @@ class DirectedGraph:
         Return list of vertices visited during DFS search
         Vertices are picked in ascending order
         """
-        # Initialize an empty set of reachable vertices.
         visited = []
-        l = []
-        if not 0 <= v_start < self.v_count:
-            return visited
-
-        # Initialize an empty stack. Add vi to the stack.
-        stack = collections.deque([v_start])
-
-        while len(stack) != 0:
-            p = stack.pop()
-            # the vertex is stored to visited[]
-            if p not in visited:
-                visited.append(p)
-                # store elements in ascending order
-                for i in range(len(self.adj_matrix[p])):
-                    if self.adj_matrix[p][i] != 0:
-                        l.append(i)
-                sorted_l = sorted(l)
-                # reset the list
-                l = []
-                # append sorted list to stack in backwards (so that it pops in ascending order)
-                for j in range(len(sorted_l) - 1, -1, -1):
-                    stack.append(sorted_l[j])
-                # return if it reached the v_end
-                if p == v_end:
-                    return visited
+        for v in self.iter_dfs(v_start):
+            visited.append(v)
+            # return if it reached the v_end
+            if v == v_end:
+                break
         return visited
 
     def bfs(self, v_start, v_end=None) -> []:
@@ -157,94 +523,440 @@ class DirectedGraph:
         Return list of vertices visited during BFS search
         Vertices are picked in ascending order
         """
-        # Initialize an empty set of reachable vertices.
         visited = []
-        l = []
+        for v in self.iter_bfs(v_start):
+            visited.append(v)
+            # return if it reached the v_end
+            if v == v_end:
+                break
+        return visited
+
+    def iter_dfs(self, v_start, details=False):
+        """
+        Yield vertices as they are visited during DFS search (same order as dfs()).
+        With details=True yield (vertex, depth, parent) tuples instead; parent is None for v_start.
+        """
         if not 0 <= v_start < self.v_count:
-            return visited
-        # Initialize an empty queue. Add vi to the stack.
-        q = collections.deque([v_start])
+            return
+        seen = bytearray(self.v_count)
+
+        # Initialize an empty stack. Add vi to the stack.
+        stack = collections.deque([(v_start, 0, None)])
+
+        while len(stack) != 0:
+            p, depth, parent = stack.pop()
+            if not seen[p]:
+                seen[p] = 1
+                yield (p, depth, parent) if details else p
+                # out-edges come in ascending order; push them backwards (so that it pops in ascending order)
+                neighbors = out_edges(self.adj_matrix, p)
+                for j in range(len(neighbors) - 1, -1, -1):
+                    if not seen[neighbors[j][0]]:
+                        stack.append((neighbors[j][0], depth + 1, p))
+
+    def iter_bfs(self, v_start, details=False):
+        """
+        Yield vertices as they are visited during BFS search (same order as bfs()).
+        With details=True yield (vertex, depth, parent) tuples instead; parent is None for v_start.
+        """
+        if not 0 <= v_start < self.v_count:
+            return
+        queued = bytearray(self.v_count)
+        queued[v_start] = 1
+        # Initialize an empty queue. Add vi to the queue.
+        q = collections.deque([(v_start, 0, None)])
 
         while len(q) != 0:
-            p = q.popleft()
-            # the vertex is stored to visited[]
-            if p not in visited:
-                visited.append(p)
-                # store elements in ascending order
-                for i in range(len(self.adj_matrix[p])):
-                    if self.adj_matrix[p][i] != 0 and i not in q:
-                        l.append(i)
-                sorted_l = sorted(l)
-                # reset the list
-                l = []
-                # append sorted list to queue in ascending order)
-                for j in range(len(sorted_l)):
-                    q.append(sorted_l[j])
-                # return if it reached the v_end
-                if p == v_end:
-                    return visited
-        return visited
+            p, depth, parent = q.popleft()
+            yield (p, depth, parent) if details else p
+            # append out-edges to queue in ascending order
+            for i, _ in out_edges(self.adj_matrix, p):
+                if not queued[i]:
+                    queued[i] = 1
+                    q.append((i, depth + 1, p))
 
     def has_cycle(self):
         """
         Returns true when there is a cycle in a graph.
         """
-        # for every vertex, call dfs.
-        for idx in range(self.v_count - 1):
-            for i in self.dfs(idx):
-                # for every vertex pair inside of vertex i, if it is flipped, it indicates the cycle
-                if self.adj_matrix[i][idx] > 0:
-                    return True
-        return False
+        return self.find_cycle() is not None
+
+    def find_cycle(self):
+        """
+        Return list of vertices forming a cycle in the graph (each edge goes to
+        the next vertex, the last one back to the first), or None if there is no cycle.
+        Algorithm: single DFS pass coloring vertices white/gray/black; an edge to a gray
+        vertex closes a cycle.
+        """
+        white, gray, black = 0, 1, 2
+        color = bytearray(self.v_count)
+        parent = [None] * self.v_count
+
+        for root in range(self.v_count):
+            if color[root] != white:
+                continue
+            color[root] = gray
+            stack = [(root, iter(out_edges(self.adj_matrix, root)))]
+            while stack:
+                u, neighbors = stack[-1]
+                for v, _ in neighbors:
+                    if color[v] == gray:
+                        # walk back from u to v to recover the cycle
+                        cycle = [u]
+                        while cycle[-1] != v:
+                            cycle.append(parent[cycle[-1]])
+                        cycle.reverse()
+                        return cycle
+                    if color[v] == white:
+                        color[v] = gray
+                        parent[v] = u
+                        stack.append((v, iter(out_edges(self.adj_matrix, v))))
+                        break
+                else:
+                    color[u] = black
+                    stack.pop()
+        return None
 
-    def dijkstra(self, src: int) -> []:
+    def topological_order(self):
+        """
+        Return list of vertices where every edge goes from an earlier to a later vertex,
+        or None if the graph has a cycle (see find_cycle()).
+        Algorithm: Kahn's algorithm, vertices with no remaining incoming edges go first.
+        """
+        in_degree = [0] * self.v_count
+        for u in range(self.v_count):
+            for v, _ in out_edges(self.adj_matrix, u):
+                in_degree[v] += 1
+
+        q = deque(v for v in range(self.v_count) if in_degree[v] == 0)
+        order = []
+        while q:
+            u = q.popleft()
+            order.append(u)
+            for v, _ in out_edges(self.adj_matrix, u):
+                in_degree[v] -= 1
+                if in_degree[v] == 0:
+                    q.append(v)
+
+        if len(order) != self.v_count:
+            return None
+        return order
+
+    def dijkstra(self, src: int, target=None, targets=None, return_parents=False):
         """
         Returns the shortest path to from each vertex to the starting vertex.
+        - target / targets: stop as soon as these vertices are settled. Distances of
+          vertices not settled by then are reported as inf.
+        - return_parents: also return the list of previous vertices on the shortest
+          paths (None for the source and unreached vertices), see build_path()
+        Full searches are served from the path cache when it is enabled (see enable_path_cache()).
         """
-        vertices = self.get_vertices()
-        visited = []
-        dist = {}
-        parent = {}
-        neighbors = {}
-        # 1. assign inf to each vertex except starting vertex has 0
-        for i in vertices:
-            dist[i] = float('inf')
-            parent[i] = None
-            # visited.append(i)
-        dist[src] = 0
-        # 2. find neighbors for each vertex
-        for j in vertices:
-            neighbors[j] = []
-            for k in range(len(self.adj_matrix[j])):
-                if self.adj_matrix[j][k] != 0 and (j and k) >= 0:
-                    neighbors[j].append(k)
-        # 3. count with the lowest cost to the starting vertex until vertices are empty
-        idx = src
-        while len(vertices) != 0:
-            for vertex in vertices:
-                if dist[idx] > dist[vertex]:
-                    idx = vertex
-            vertices.remove(idx)
-
-            for v in neighbors[idx]:
-                if v in vertices:
-                    path = self.adj_matrix[idx][v] + dist[idx]
-                    if path < dist[v]:
-                        dist[v] = path
-                        parent[v] = idx
-
-            if len(vertices) > 0:
-                idx = vertices[0]
-
-        dijkstra = []
-        for d in dist.values():
-            dijkstra += [d]
-        return dijkstra
+        # 1. vertices that end the search once they are all settled
+        stop = set()
+        if target is not None:
+            stop.add(target)
+        if targets is not None:
+            stop.update(targets)
 
+        cache = self._path_cache
+        if cache is not None and not stop:
+            entry = cache.get(src, self._version)
+            if entry is None:
+                entry = self._dijkstra(src, stop)
+                cache.put(src, self._version, entry)
+            dist, parent = list(entry[0]), list(entry[1])
+        else:
+            dist, parent = self._dijkstra(src, stop)
+        return (dist, parent) if return_parents else dist
 
+    def _dijkstra(self, src: int, stop: set):
+        """
+        Return (dist, parent) lists of a heap dijkstra search from src, stopping early
+        once every vertex of stop is settled (when stop is not empty)
+        """
+        dist = [float('inf')] * self.v_count
+        parent = [None] * self.v_count
+        if not 0 <= src < self.v_count:
+            return dist, parent
 
+        # 2. pop the closest vertex from the heap; stale entries are skipped (lazy deletion)
+        settled = bytearray(self.v_count)
+        best = [float('inf')] * self.v_count
+        best[src] = 0
+        heap = [(0, src)]
+        stopped = False
+        settled_count = relaxed = pushes = 0
+        while heap:
+            d, u = heapq.heappop(heap)
+            if settled[u]:
+                continue
+            settled[u] = 1
+            settled_count += 1
+            dist[u] = d
+            if stop:
+                stop.discard(u)
+                if not stop:
+                    stopped = True
+                    break
+            # 3. relax out-edges
+            edges = out_edges(self.adj_matrix, u)
+            relaxed += len(edges)
+            for v, weight in edges:
+                path = d + weight
+                if path < best[v]:
+                    best[v] = path
+                    parent[v] = u
+                    heapq.heappush(heap, (path, v))
+                    pushes += 1
 
+        if instrumentation.counters is not None:
+            instrumentation.count('vertices_settled', settled_count)
+            instrumentation.count('edges_relaxed', relaxed)
+            instrumentation.count('heap_pushes', pushes + 1)
+        if stopped:
+            for v in range(self.v_count):
+                if not settled[v]:
+                    parent[v] = None
+        return dist, parent
 
+    def dijkstra_many(self, sources, workers=None, snapshot=None, chunk_size=None):
+        """
+        Yield (src, dist) for every source, running dijkstra() on a pool of worker processes.
+        Results come back in completion order, not in the order of sources.
+        - workers: number of processes (default: CPU count); 1 runs in this process
+        - snapshot: path of an up-to-date save() of this graph; by default one is written
+          to a temporary file. Workers memory-map it once instead of receiving the graph per task.
+        - chunk_size: sources per task (default: about 4 tasks per worker)
+        """
+        sources = list(sources)
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1 or len(sources) <= 1:
+            for src in sources:
+                yield src, self.dijkstra(src)
+            return
+        if chunk_size is None:
+            chunk_size = max(1, len(sources) // (workers * 4))
+
+        path = snapshot
+        if path is None:
+            fd, path = tempfile.mkstemp(suffix='.graph')
+            os.close(fd)
+            self.save(path)
+        executor = ProcessPoolExecutor(workers, initializer=_load_worker_graph, initargs=(path,))
+        try:
+            pending = {executor.submit(_dijkstra_batch, sources[i:i + chunk_size])
+                       for i in range(0, len(sources), chunk_size)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        finally:
+            executor.shutdown(cancel_futures=True)
+            if snapshot is None:
+                os.remove(path)
+
+    def shortest_path(self, src: int, dst: int):
+        """
+        Return (distance, list of vertices) of the shortest path from src to dst,
+        (inf, []) if dst cannot be reached.
+        Algorithm: bidirectional dijkstra, forward from src over out-edges and backward
+        from dst over in-edges, until the two searches cannot improve the best meeting point.
+        """
+        if not (0 <= src < self.v_count and 0 <= dst < self.v_count):
+            return float('inf'), []
+        if src == dst:
+            return 0, [src]
+
+        reverse = self._in_edges()
+        inf = float('inf')
+        # index 0: forward search, index 1: backward search
+        dist = ({src: 0}, {dst: 0})
+        parent = ({src: None}, {dst: None})
+        settled = (set(), set())
+        heaps = ([(0, src)], [(0, dst)])
+        best, meet = inf, None
+        settled_count = relaxed = pushes = 0
+
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+            # expand the side whose closest vertex is nearer
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            d, u = heapq.heappop(heaps[side])
+            if u in settled[side]:
+                continue
+            settled[side].add(u)
+            settled_count += 1
+            edges = out_edges(self.adj_matrix, u) if side == 0 else reverse[u]
+            relaxed += len(edges)
+            for v, weight in edges:
+                path = d + weight
+                if path < dist[side].get(v, inf):
+                    dist[side][v] = path
+                    parent[side][v] = u
+                    heapq.heappush(heaps[side], (path, v))
+                    pushes += 1
+                    # v reached from both ends
+                    if v in dist[1 - side] and path + dist[1 - side][v] < best:
+                        best, meet = path + dist[1 - side][v], v
+
+        if instrumentation.counters is not None:
+            instrumentation.count('vertices_settled', settled_count)
+            instrumentation.count('edges_relaxed', relaxed)
+            instrumentation.count('heap_pushes', pushes + 2)
+        if meet is None:
+            return inf, []
+        # walk back to src, then forward to dst
+        path = [meet]
+        while parent[0][path[-1]] is not None:
+            path.append(parent[0][path[-1]])
+        path.reverse()
+        while parent[1][path[-1]] is not None:
+            path.append(parent[1][path[-1]])
+        return best, path
+
+    def _in_edges(self) -> []:
+        """
+        Return list of (src, weight) in-edges per vertex (cached until the graph changes)
+        """
+        cache = self._reverse_cache
+        if cache is None or cache[0] != self._version:
+            reverse = [[] for _ in range(self.v_count)]
+            for u, v, weight in self.iter_edges():
+                reverse[v].append((u, weight))
+            cache = self._reverse_cache = (self._version, reverse)
+        return cache[1]
+
+    def enable_path_cache(self, max_bytes: int = 64 * 1024 * 1024) -> None:
+        """
+        Cache full dijkstra() results per source (LRU, about max_bytes of memory).
+        Any change to the graph invalidates the cached results.
+        """
+        self._path_cache = PathCache(max_bytes)
+
+    def disable_path_cache(self) -> None:
+        """
+        Drop the dijkstra() result cache
+        """
+        self._path_cache = None
+
+    def path_cache_stats(self):
+        """
+        Return dict of path cache counters (hits, misses, evictions, invalidations,
+        entries, bytes, max_bytes), or None if the cache is disabled
+        """
+        if self._path_cache is None:
+            return None
+        return self._path_cache.stats()
+
+    @property
+    def version(self) -> int:
+        """
+        Return number of changes made to the graph so far
+        """
+        return self._version
+
+    def all_pairs_shortest_paths(self, next_hop=False, dense_threshold=0.1):
+        """
+        Return matrix of shortest distances between every pair of vertices
+        (dist[u][v], inf when v is unreachable from u).
+        - with numpy and edge density >= dense_threshold: vectorized Floyd-Warshall,
+          the result is a numpy ndarray
+        - otherwise: heap dijkstra() from every vertex, the result is a list of array('d') rows
+        next_hop=True also returns a matrix of the first vertex after u on the
+        shortest path to v (-1 when unreachable), see next_hop_path().
+        """
+        n = self.v_count
+        if np is not None and n > 0 and self.edge_count >= dense_threshold * n * n:
+            return self._floyd_warshall(next_hop)
+
+        dist = []
+        hops = []
+        for src in range(n):
+            row, parent = self._dijkstra(src, set())
+            dist.append(array('d', row))
+            if next_hop:
+                # parents are settled before their children, so walk vertices by distance
+                hop = array('q', [-1]) * n
+                hop[src] = src
+                for v in sorted((v for v in range(n) if parent[v] is not None), key=row.__getitem__):
+                    hop[v] = v if parent[v] == src else hop[parent[v]]
+                hops.append(hop)
+        return (dist, hops) if next_hop else dist
+
+    def _floyd_warshall(self, next_hop):
+        """
+        Vectorized Floyd-Warshall over a dense numpy copy of the adjacency matrix
+        """
+        n = self.v_count
+        if isinstance(self.adj_matrix, CompactMatrix) and self.adj_matrix.use_numpy:
+            weights = np.array(self.adj_matrix._data[:n, :n], dtype=float)
+        else:
+            weights = np.zeros((n, n))
+            for u in range(n):
+                for v, w in out_edges(self.adj_matrix, u):
+                    weights[u, v] = w
+        has_edge = weights != 0
+        dist = np.where(has_edge, weights, np.inf)
+        np.fill_diagonal(dist, 0)
+        hops = np.where(has_edge, np.arange(n), -1)
+        np.fill_diagonal(hops, np.arange(n))
+
+        # one row/column broadcast per pivot
+        for k in range(n):
+            via = dist[:, k, None] + dist[None, k, :]
+            better = via < dist
+            dist = np.where(better, via, dist)
+            if next_hop:
+                hops = np.where(better, hops[:, k, None], hops)
+        return (dist, hops) if next_hop else dist
+
+    @staticmethod
+    def next_hop_path(hops, src: int, dst: int) -> []:
+        """
+        Return list of vertices on the shortest path from src to dst using the
+        next-hop matrix returned by all_pairs_shortest_paths(). Empty list if unreachable.
+        """
+        if hops[src][dst] == -1:
+            return []
+        path = [src]
+        while path[-1] != dst:
+            path.append(int(hops[path[-1]][dst]))
+        return path
+
+    @staticmethod
+    def build_path(parent: [], src: int, dst: int) -> []:
+        """
+        Return list of vertices on the shortest path from src to dst using the
+        parent list returned by dijkstra(). Empty list if dst was not reached.
+        """
+        path = [dst]
+        while parent[path[-1]] is not None:
+            path.append(parent[path[-1]])
+        if path[-1] != src:
+            return []
+        path.reverse()
+        return path
+
+
+
+# graph loaded by each dijkstra_many() worker process
+_worker_graph = None
+
+
+def _load_worker_graph(path) -> None:
+    """
+    Process pool initializer: memory-map the graph snapshot once per worker
+    """
+    global _worker_graph
+    _worker_graph = DirectedGraph.load(path, mmap=True)
+
+
+def _dijkstra_batch(sources) -> []:
+    """
+    Return list of (src, dist) for a batch of sources on the worker's graph
+    """
+    return [(src, _worker_graph.dijkstra(src)) for src in sources]
 
 
 if __name__ == '__main__':
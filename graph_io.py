@@ -0,0 +1,260 @@
+# Course: CS261 - Data Structures
+# Description: This file includes methods to save and load graphs
+#              (binary snapshots and plain-text edge lists).
+
+import mmap as _mmap
+import os
+import struct
+import sys
+from array import array
+
+from d_graph import DirectedGraph
+from graph_storage import CSRMatrix
+from ud_graph import NeighborSet, UndirectedGraph, VertexIndex
+
+# Snapshot layout (all integers little-endian, arrays 8 bytes per item):
+#   header        magic, version, kind, weight type, vertex count, entry count, name bytes
+#   offsets       vertex count + 1 int64, entries of vertex u are offsets[u]:offsets[u + 1]
+#   neighbors     entry count int64
+#   weights       entry count int64 or float64 (directed graphs only)
+#   name offsets  vertex count + 1 int64 into the name bytes (undirected graphs only)
+#   name bytes    UTF-8 vertex names (undirected graphs only)
+MAGIC = b'GRPH'
+VERSION = 1
+HEADER = struct.Struct('<4sHBBqqq')
+DIRECTED, UNDIRECTED = 0, 1
+WEIGHT_TYPES = ('q', 'd')
+
+
+def save_graph(graph, path) -> None:
+    """
+    Write DirectedGraph or UndirectedGraph to path in the binary snapshot format
+    """
+    if isinstance(graph, DirectedGraph):
+        matrix = graph.adj_matrix
+        if not isinstance(matrix, CSRMatrix):
+            matrix = CSRMatrix.from_storage(matrix)
+        weight_type = 'q' if _typecode(matrix.weights) == 'q' else 'd'
+        sections = [matrix.offsets, matrix.indices, _as_array(weight_type, matrix.weights)]
+        header = HEADER.pack(MAGIC, VERSION, DIRECTED, WEIGHT_TYPES.index(weight_type),
+                             graph.v_count, len(matrix.indices), 0)
+        blob = b''
+    elif isinstance(graph, UndirectedGraph):
+        # ids follow insertion order so loading gives back the same adj_list order
+        index = VertexIndex(graph.adj_list)
+        offsets = array('q', [0])
+        neighbors = array('q')
+        name_offsets = array('q', [0])
+        names = []
+        for name in index.names:
+            if not isinstance(name, str):
+                raise TypeError(f'vertex names must be strings to be saved: {name!r}')
+            neighbors.extend(index.ids[v] for v in graph.adj_list[name])
+            offsets.append(len(neighbors))
+            names.append(name.encode('utf-8'))
+            name_offsets.append(name_offsets[-1] + len(names[-1]))
+        blob = b''.join(names)
+        sections = [offsets, neighbors, name_offsets]
+        header = HEADER.pack(MAGIC, VERSION, UNDIRECTED, 0, len(index), len(neighbors), len(blob))
+    else:
+        raise TypeError(f'cannot save {type(graph).__name__}')
+
+    with open(path, 'wb') as f:
+        f.write(header)
+        for section in sections:
+            f.write(_little_endian(section))
+        f.write(blob)
+
+
+def load_graph(path, mmap=True):
+    """
+    Read graph written by save_graph().
+    With mmap=True a DirectedGraph is returned frozen (CSR storage) on top of a
+    read-only memory map of the file, so processes loading the same file share one
+    copy and nothing is deserialized. An UndirectedGraph always rebuilds its adj_list.
+    """
+    with open(path, 'rb') as f:
+        if mmap:
+            data = memoryview(_mmap.mmap(f.fileno(), 0, access=_mmap.ACCESS_READ))
+        else:
+            data = memoryview(f.read())
+
+    magic, version, kind, weight_code, vertex_count, entry_count, blob_size = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f'{path} is not a graph snapshot')
+    if version != VERSION:
+        raise ValueError(f'unsupported snapshot version {version}')
+
+    pos = HEADER.size
+    offsets, pos = _read_array(data, pos, 'q', vertex_count + 1, mmap)
+    neighbors, pos = _read_array(data, pos, 'q', entry_count, mmap)
+
+    if kind == DIRECTED:
+        weights, pos = _read_array(data, pos, WEIGHT_TYPES[weight_code], entry_count, mmap)
+        graph = DirectedGraph()
+        graph.adj_matrix = CSRMatrix(offsets, neighbors, weights)
+        graph.v_count = vertex_count
+        graph._edge_count = entry_count
+        return graph
+
+    if kind == UNDIRECTED:
+        name_offsets, pos = _read_array(data, pos, 'q', vertex_count + 1, mmap)
+        blob = data[pos:pos + blob_size]
+        names = [str(blob[name_offsets[i]:name_offsets[i + 1]], 'utf-8') for i in range(vertex_count)]
+        graph = UndirectedGraph()
+        for u in range(vertex_count):
+            graph.adj_list[names[u]] = NeighborSet(names[v] for v in neighbors[offsets[u]:offsets[u + 1]])
+        graph._edge_count = entry_count // 2
+        return graph
+
+    raise ValueError(f'unknown graph kind {kind}')
+
+
+def iter_edge_list(path, directed=True, delimiter=None, comment='#', progress=None):
+    """
+    Yield edges parsed lazily from a text file with one edge per line
+    - directed: "src dst [weight]" with integer vertices (weight defaults to 1)
+    - undirected: "u v" with string vertices
+    Fields are split on whitespace by default or on delimiter (e.g. ','). Blank lines
+    and lines starting with comment are skipped. progress(bytes_read, total_bytes)
+    is called every 64 KiB read.
+    """
+    total = os.path.getsize(path)
+    reported = 0
+    for edge, bytes_read in _read_edges(path, directed, delimiter, comment):
+        if progress is not None and bytes_read - reported >= 65536:
+            progress(bytes_read, total)
+            reported = bytes_read
+        yield edge
+    if progress is not None:
+        progress(total, total)
+
+
+def read_edge_list(path, directed=True, delimiter=None, comment='#', chunk_size=100000,
+                   progress=None, storage='sparse'):
+    """
+    Return DirectedGraph or UndirectedGraph read from an edge-list file (see iter_edge_list()).
+    Edges are parsed lazily and inserted in chunks of chunk_size with add_edges(), so
+    memory stays bounded by the graph itself. progress(edges_read, bytes_read, total_bytes)
+    is called after every chunk. storage is the DirectedGraph storage (see graph_storage).
+    """
+    total = os.path.getsize(path)
+    graph = DirectedGraph.with_storage(storage) if directed else UndirectedGraph()
+    edges = _read_edges(path, directed, delimiter, comment)
+    edges_read = bytes_read = reported = 0
+    chunk = []
+    while True:
+        chunk.clear()
+        for edge, bytes_read in edges:
+            chunk.append(edge)
+            if len(chunk) == chunk_size:
+                break
+        if not chunk:
+            break
+        if directed:
+            # grow the graph to fit the largest vertex of the chunk
+            largest = max(max(u, v) for u, v, _ in chunk)
+            if largest >= graph.v_count:
+                graph.add_vertices(largest + 1 - graph.v_count)
+        graph.add_edges(chunk)
+        edges_read += len(chunk)
+        if progress is not None:
+            progress(edges_read, bytes_read, total)
+            reported = bytes_read
+    # trailing blank or comment lines are only seen once the file is exhausted
+    if progress is not None and reported < total:
+        progress(edges_read, total, total)
+    return graph
+
+
+def _read_edges(path, directed, delimiter, comment):
+    """
+    Yield (edge, bytes read up to the end of its line) for every edge in an edge-list file
+    """
+    bytes_read = 0
+    with open(path, 'rb') as f:
+        for line_no, raw in enumerate(f, 1):
+            bytes_read += len(raw)
+            line = raw.decode('utf-8').strip()
+            if not line or (comment and line.startswith(comment)):
+                continue
+            fields = [field.strip() for field in line.split(delimiter)]
+            try:
+                if not directed:
+                    u, v = fields
+                    edge = u, v
+                elif len(fields) == 2:
+                    edge = int(fields[0]), int(fields[1]), 1
+                else:
+                    src, dst, weight = fields
+                    edge = int(src), int(dst), _parse_weight(weight)
+            except ValueError:
+                raise ValueError(f'{path}:{line_no}: cannot parse edge {line!r}') from None
+            yield edge, bytes_read
+
+
+def write_edge_list(graph, path, delimiter=' ') -> int:
+    """
+    Write edges of a DirectedGraph ("src dst weight") or UndirectedGraph ("u v")
+    to path one per line without building the edge list. Return number of edges written.
+    """
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for edge in graph.iter_edges():
+            f.write(delimiter.join(map(str, edge)))
+            f.write('\n')
+            count += 1
+    return count
+
+
+def _parse_weight(text: str):
+    """
+    Return weight as int when possible, float otherwise
+    """
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def _typecode(values) -> str:
+    """
+    Return typecode of an array or format of a memoryview
+    """
+    return values.typecode if isinstance(values, array) else values.format
+
+
+def _as_array(typecode: str, values):
+    """
+    Return values as an array of the given typecode (no copy if it already is one)
+    """
+    if isinstance(values, array) and values.typecode == typecode:
+        return values
+    return array(typecode, values)
+
+
+def _little_endian(values):
+    """
+    Return bytes of an array or memoryview in little-endian order
+    """
+    if sys.byteorder == 'little':
+        return values
+    values = array(_typecode(values), values)
+    values.byteswap()
+    return values
+
+
+def _read_array(data: memoryview, pos: int, typecode: str, count: int, shared: bool):
+    """
+    Return (array of count items at pos, position after it). Shared arrays are
+    memoryviews into data; otherwise (or on big-endian machines) they are copied.
+    """
+    end = pos + 8 * count
+    raw = data[pos:end]
+    if shared and sys.byteorder == 'little':
+        return raw.cast(typecode), end
+    values = array(typecode)
+    values.frombytes(raw)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values, end
@@ -0,0 +1,154 @@
+# Course: CS261 - Data Structures
+# Description: This file includes an asyncio facade that runs graph queries off the event loop.
+#
+# Usage:
+#     async with GraphQueryService(graph) as service:
+#         client = service.client()
+#         dist = await client.dijkstra(3, timeout=0.5)
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+# read-only methods that can be queried through the service
+QUERIES = frozenset((
+    'get_vertices', 'get_edges', 'is_valid_path', 'dfs', 'bfs', 'has_cycle', 'find_cycle',
+    'topological_order', 'dijkstra', 'shortest_path', 'all_pairs_shortest_paths',
+    'count_connected_components', 'connected',
+))
+
+
+class _Call:
+    """
+    One computation running in the executor and the number of callers waiting for it
+    """
+
+    def __init__(self, future):
+        self.future = future
+        self.waiters = 0
+
+
+class GraphQueryService:
+    """
+    Run queries of a DirectedGraph or UndirectedGraph in an executor
+    - queries run on a read-only snapshot, so the graph can keep changing on the event loop
+    - identical queries running at the same time share one computation
+    - a query can be cancelled or given a timeout; the computation itself is
+      only cancelled once nobody waits for it (and only if it has not started yet)
+    Change the graph from the event loop thread only; changes are noticed through
+    the graph's version.
+    """
+
+    def __init__(self, graph, executor=None, max_workers=None):
+        self.graph = graph
+        self._owns_executor = executor is None
+        self._executor = executor if executor is not None else ThreadPoolExecutor(max_workers)
+        self._snapshot = None
+        self._snapshot_version = None
+        self._inflight = {}
+        self.queries = 0
+        self.computed = 0
+        self.coalesced = 0
+        self.cancelled = 0
+        self.timed_out = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        """
+        Shut down the executor if the service created it; queued queries are dropped
+        """
+        if self._owns_executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def client(self):
+        """
+        Return in-process client with every query method as a coroutine
+        """
+        return GraphClient(self)
+
+    async def query(self, method: str, *args, timeout=None, **kwargs):
+        """
+        Return result of graph.method(*args, **kwargs) computed in the executor.
+        Raise TimeoutError if it takes longer than timeout seconds. Results may be
+        shared with other callers, do not modify them.
+        """
+        if method not in QUERIES:
+            raise ValueError(f'unknown query: {method}')
+        loop = asyncio.get_running_loop()
+        self.queries += 1
+
+        # 1. join an identical query on the same graph version if one is running
+        version = self.graph.version
+        key = (version, method, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:  # unhashable arguments (e.g. a path list) are never shared
+            key = None
+        call = self._inflight.get(key) if key is not None else None
+
+        # 2. otherwise start it on the snapshot of this version
+        if call is None:
+            fn = functools.partial(getattr(self._snapshot_of(version), method), *args, **kwargs)
+            call = _Call(loop.run_in_executor(self._executor, fn))
+            self.computed += 1
+            if key is not None:
+                self._inflight[key] = call
+                call.future.add_done_callback(lambda _: self._forget(key, call))
+        else:
+            self.coalesced += 1
+
+        # 3. wait without letting one caller's cancellation cancel the others
+        call.waiters += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(call.future), timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.future.done():
+                call.future.cancel()
+                self._forget(key, call)
+
+    def stats(self) -> dict:
+        return {'queries': self.queries, 'computed': self.computed, 'coalesced': self.coalesced,
+                'cancelled': self.cancelled, 'timed_out': self.timed_out, 'in_flight': len(self._inflight)}
+
+    def _snapshot_of(self, version):
+        """
+        Return read-only snapshot of the graph, taking a new one if the graph changed
+        """
+        if self._snapshot is None or self._snapshot_version != version:
+            self._snapshot = self.graph.snapshot()
+            self._snapshot_version = version
+        return self._snapshot
+
+    def _forget(self, key, call) -> None:
+        if key is not None and self._inflight.get(key) is call:
+            del self._inflight[key]
+
+
+class GraphClient:
+    """
+    In-process client of a GraphQueryService: await client.dijkstra(3, timeout=1.0)
+    """
+
+    def __init__(self, service: GraphQueryService):
+        self._service = service
+
+    def __getattr__(self, method: str):
+        if method not in QUERIES:
+            raise AttributeError(method)
+
+        async def call(*args, timeout=None, **kwargs):
+            return await self._service.query(method, *args, timeout=timeout, **kwargs)
+        call.__name__ = method
+        return call
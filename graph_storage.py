@@ -0,0 +1,443 @@
+# Course: CS261 - Data Structures
+# Description: This file includes storage backends for the DirectedGraph adjacency matrix.
+
+from array import array
+from bisect import bisect_left
+import sys
+
+import instrumentation
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional
+    np = None
+
+
+class CompactRow:
+    """
+    View of one row of a CompactMatrix
+    - behaves like the list rows of a plain adjacency matrix
+    """
+
+    def __init__(self, matrix, row: int):
+        self._matrix = matrix
+        self._row = row
+
+    def __len__(self):
+        return self._matrix._size
+
+    def _offset(self, col: int) -> int:
+        size = self._matrix._size
+        if col < 0:
+            col += size
+        if not 0 <= col < size:
+            raise IndexError('row index out of range')
+        return self._row * self._matrix._capacity + col
+
+    def __getitem__(self, col: int):
+        return self._matrix._data[self._offset(col)]
+
+    def __setitem__(self, col: int, weight) -> None:
+        self._matrix.unshare()
+        self._matrix._data[self._offset(col)] = weight
+
+    def __iter__(self):
+        start = self._row * self._matrix._capacity
+        return iter(self._matrix._data[start:start + self._matrix._size])
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class CompactMatrix:
+    """
+    Square adjacency matrix stored in one contiguous typed buffer
+    - numpy ndarray when numpy is installed, array('d') otherwise
+    - spare capacity is reserved so adding vertices is amortized
+    - snapshots share the buffer until one side writes to it
+    """
+
+    def __init__(self, typecode: str = 'd', use_numpy=None):
+        if use_numpy is None:
+            use_numpy = np is not None
+        elif use_numpy and np is None:
+            raise ImportError('numpy is not installed')
+        self.typecode = typecode
+        self.use_numpy = use_numpy
+        self._size = 0
+        self._capacity = 0
+        # True while a snapshot may be reading the same buffer
+        self._shared = False
+        if use_numpy:
+            self._data = np.zeros((0, 0), dtype=typecode)
+        else:
+            self._data = array(typecode)
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, row: int):
+        if row < 0:
+            row += self._size
+        if not 0 <= row < self._size:
+            raise IndexError('matrix index out of range')
+        if self.use_numpy:
+            return self._data[row, :self._size]
+        return CompactRow(self, row)
+
+    def __iter__(self):
+        for row in range(self._size):
+            yield self[row]
+
+    def grow(self, n: int) -> None:
+        """
+        Add n empty rows and columns, reallocating only when capacity runs out
+        """
+        size = self._size + n
+        if size > self._capacity:
+            self._reserve(max(size, self._capacity + self._capacity // 4))
+        self._size = size
+
+    def _reserve(self, capacity: int) -> None:
+        """
+        Reallocate the buffer with the given row capacity and copy existing rows over
+        """
+        old, old_capacity, size = self._data, self._capacity, self._size
+        if self.use_numpy:
+            data = np.zeros((capacity, capacity), dtype=self.typecode)
+            data[:size, :size] = old[:size, :size]
+        else:
+            data = array(self.typecode, [0]) * (capacity * capacity)
+            for i in range(size):
+                data[i * capacity:i * capacity + size] = old[i * old_capacity:i * old_capacity + size]
+        self._data = data
+        self._capacity = capacity
+        self._shared = False
+
+    def unshare(self) -> None:
+        """
+        Copy the buffer if a snapshot shares it; call before writing to it
+        """
+        if self._shared:
+            self._data = self._data.copy() if self.use_numpy else array(self.typecode, self._data)
+            self._shared = False
+
+    def set_weight(self, src: int, dst: int, weight) -> None:
+        """
+        Set weight of edge src -> dst; weight 0 removes the edge
+        """
+        self.unshare()
+        if self.use_numpy:
+            self._data[src, dst] = weight
+        else:
+            self._data[src * self._capacity + dst] = weight
+
+    def out_edges(self, u: int):
+        """
+        Return (dst, weight) pairs of the out-edges of u in ascending order
+        """
+        if self.use_numpy:
+            row = self._data[u, :self._size]
+            dst = np.flatnonzero(row)
+            return list(zip(dst.tolist(), row[dst].tolist()))
+        start = u * self._capacity
+        row = self._data[start:start + self._size]
+        return [(v, w) for v, w in enumerate(row) if w != 0]
+
+    def snapshot(self):
+        """
+        Return copy of the matrix sharing the buffer; whichever side writes first
+        copies it (see unshare())
+        """
+        copy = CompactMatrix(self.typecode, self.use_numpy)
+        copy._data = self._data
+        copy._size = self._size
+        copy._capacity = self._capacity
+        copy._shared = self._shared = True
+        return copy
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Return number of bytes held by the buffer (including spare capacity)
+        """
+        if self.use_numpy:
+            return int(self._data.nbytes)
+        return self._data.itemsize * len(self._data)
+
+
+class SparseRow:
+    """
+    Dense-looking view of one row of a SparseMatrix (missing entries read as 0)
+    """
+
+    def __init__(self, matrix, row: int):
+        self._matrix = matrix
+        self._row = row
+
+    def __len__(self):
+        return len(self._matrix)
+
+    def _check(self, col: int) -> int:
+        size = len(self._matrix)
+        if col < 0:
+            col += size
+        if not 0 <= col < size:
+            raise IndexError('row index out of range')
+        return col
+
+    def __getitem__(self, col: int):
+        return self._matrix._rows[self._row].get(self._check(col), 0)
+
+    def __setitem__(self, col: int, weight) -> None:
+        self._matrix.set_weight(self._row, self._check(col), weight)
+
+    def __iter__(self):
+        row = self._matrix._rows[self._row]
+        return (row.get(col, 0) for col in range(len(self._matrix)))
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class SparseMatrix:
+    """
+    Adjacency stored as one {dst: weight} dict per vertex
+    - memory is O(V + E)
+    - enumerating the out-edges of a vertex is O(out-degree)
+    """
+
+    def __init__(self):
+        self._rows = []
+        # sorted out-edges per row, dropped when the row changes
+        self._sorted = {}
+        # bytearray flagging rows shared with a snapshot (None if no row is shared)
+        self._shared = None
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, row: int):
+        if row < 0:
+            row += len(self._rows)
+        if not 0 <= row < len(self._rows):
+            raise IndexError('matrix index out of range')
+        return SparseRow(self, row)
+
+    def __iter__(self):
+        for row in range(len(self._rows)):
+            yield SparseRow(self, row)
+
+    def grow(self, n: int) -> None:
+        """
+        Add n vertices without out-edges
+        """
+        self._rows.extend({} for _ in range(n))
+        if self._shared is not None:
+            self._shared.extend(bytes(n))
+
+    def set_weight(self, src: int, dst: int, weight) -> None:
+        """
+        Set weight of edge src -> dst; weight 0 removes the edge
+        """
+        if self._shared is not None and self._shared[src]:
+            self._rows[src] = dict(self._rows[src])
+            self._shared[src] = 0
+        if weight == 0:
+            self._rows[src].pop(dst, None)
+        else:
+            self._rows[src][dst] = weight
+        self._sorted.pop(src, None)
+
+    def out_edges(self, u: int):
+        """
+        Return (dst, weight) pairs of the out-edges of u in ascending order
+        (cached until the row changes, do not modify)
+        """
+        edges = self._sorted.get(u)
+        if edges is None:
+            edges = self._sorted[u] = sorted(self._rows[u].items())
+            if instrumentation.counters is not None:
+                instrumentation.count('neighbor_sorts')
+        return edges
+
+    def freeze(self):
+        """
+        Return read-only CSR copy of the matrix
+        """
+        return CSRMatrix.from_storage(self)
+
+    def snapshot(self):
+        """
+        Return copy of the matrix sharing the row dicts; a shared row is copied
+        on its next change
+        """
+        copy = SparseMatrix()
+        copy._rows = list(self._rows)
+        copy._sorted = dict(self._sorted)
+        self._shared = bytearray(b'\x01') * len(self._rows)
+        return copy
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Return number of bytes used by the row dicts (not counting the boxed weights)
+        """
+        return sys.getsizeof(self._rows) + sum(sys.getsizeof(row) for row in self._rows)
+
+
+class CSRRow:
+    """
+    Read-only dense-looking view of one row of a CSRMatrix
+    """
+
+    def __init__(self, matrix, row: int):
+        self._matrix = matrix
+        self._row = row
+
+    def __len__(self):
+        return len(self._matrix)
+
+    def __getitem__(self, col: int):
+        m = self._matrix
+        if col < 0:
+            col += len(m)
+        if not 0 <= col < len(m):
+            raise IndexError('row index out of range')
+        start, end = m.offsets[self._row], m.offsets[self._row + 1]
+        i = bisect_left(m.indices, col, start, end)
+        if i < end and m.indices[i] == col:
+            return m.weights[i]
+        return 0
+
+    def __setitem__(self, col: int, weight) -> None:
+        raise TypeError('CSR storage is frozen, thaw() the graph before changing it')
+
+    def __iter__(self):
+        dense = [0] * len(self._matrix)
+        for v, w in self._matrix.out_edges(self._row):
+            dense[v] = w
+        return iter(dense)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class CSRMatrix:
+    """
+    Read-only compressed sparse row adjacency
+    - out-edges of u are indices[offsets[u]:offsets[u + 1]] (ascending)
+      with matching weights
+    """
+
+    def __init__(self, offsets, indices, weights):
+        self.offsets = offsets
+        self.indices = indices
+        self.weights = weights
+
+    @classmethod
+    def from_storage(cls, matrix):
+        """
+        Build CSR arrays from any adjacency matrix storage
+        """
+        offsets = array('q', [0])
+        indices = array('q')
+        weights = []
+        for u in range(len(matrix)):
+            for v, w in out_edges(matrix, u):
+                indices.append(v)
+                weights.append(w)
+            offsets.append(len(indices))
+        # keep integer weights as integers
+        typecode = 'q' if all(isinstance(w, int) for w in weights) else 'd'
+        return cls(offsets, indices, array(typecode, weights))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int):
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError('matrix index out of range')
+        return CSRRow(self, row)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield CSRRow(self, row)
+
+    def grow(self, n: int) -> None:
+        raise TypeError('CSR storage is frozen, thaw() the graph before changing it')
+
+    def set_weight(self, src: int, dst: int, weight) -> None:
+        raise TypeError('CSR storage is frozen, thaw() the graph before changing it')
+
+    def out_edges(self, u: int):
+        """
+        Return (dst, weight) pairs of the out-edges of u in ascending order
+        """
+        start, end = self.offsets[u], self.offsets[u + 1]
+        return list(zip(self.indices[start:end], self.weights[start:end]))
+
+    def snapshot(self):
+        """
+        Return the matrix itself (it never changes)
+        """
+        return self
+
+    def thaw(self):
+        """
+        Return mutable SparseMatrix copy of the matrix
+        """
+        matrix = SparseMatrix()
+        matrix.grow(len(self))
+        for u in range(len(self)):
+            matrix._rows[u] = dict(self.out_edges(u))
+        return matrix
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Return number of bytes held by the CSR arrays
+        """
+        return sum(a.itemsize * len(a) for a in (self.offsets, self.indices, self.weights))
+
+
+def create_storage(storage):
+    """
+    Return an empty adjacency matrix for the given storage name
+    - 'list': plain list of lists
+    - 'compact': CompactMatrix
+    - 'sparse': SparseMatrix
+    An existing empty storage object is returned as is.
+    """
+    if storage == 'list':
+        return []
+    if storage == 'compact':
+        return CompactMatrix()
+    if storage == 'sparse':
+        return SparseMatrix()
+    if isinstance(storage, str):
+        raise ValueError(f'unknown storage: {storage}')
+    if len(storage) != 0:
+        raise ValueError('storage must be empty')
+    return storage
+
+
+def storage_nbytes(matrix) -> int:
+    """
+    Return number of bytes used by an adjacency matrix.
+    For list storage, only the list objects are counted (not the boxed weights).
+    """
+    if isinstance(matrix, list):
+        return sys.getsizeof(matrix) + sum(sys.getsizeof(row) for row in matrix)
+    return matrix.nbytes
+
+
+def out_edges(matrix, u: int):
+    """
+    Return (dst, weight) pairs of the out-edges of u in ascending order for any storage
+    """
+    if isinstance(matrix, list):
+        return [(v, w) for v, w in enumerate(matrix[u]) if w != 0]
+    return matrix.out_edges(u)
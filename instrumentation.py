@@ -0,0 +1,121 @@
+# Course: CS261 - Data Structures
+# Description: This file includes opt-in call counting and timing of the graph classes.
+#
+# While disabled the graph classes run their original methods and the algorithms only
+# check one module attribute per call, so there is nothing to pay for.
+
+import functools
+import inspect
+import threading
+import time
+
+# upper bounds (seconds) of the latency histogram buckets; the last bucket is open-ended
+BUCKETS = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0, 10.0)
+
+# algorithm counters (vertices_settled, edges_relaxed, heap_pushes, neighbor_sorts);
+# None while instrumentation is disabled
+counters = None
+
+_lock = threading.Lock()
+_methods = {}
+_originals = {}
+
+
+def enable() -> None:
+    """
+    Start recording: wrap every public method of DirectedGraph and UndirectedGraph
+    with a timer and turn on the algorithm counters
+    """
+    global counters
+    from d_graph import DirectedGraph
+    from ud_graph import UndirectedGraph
+
+    with _lock:
+        if counters is None:
+            counters = {}
+        for cls in (DirectedGraph, UndirectedGraph):
+            for attr, fn in list(vars(cls).items()):
+                # generators only do their work once iterated, so timing the call means nothing
+                if attr.startswith('_') or not inspect.isfunction(fn) or inspect.isgeneratorfunction(fn):
+                    continue
+                if (cls, attr) not in _originals:
+                    _originals[(cls, attr)] = fn
+                    setattr(cls, attr, _timed(f'{cls.__name__}.{attr}', fn))
+
+
+def disable() -> None:
+    """
+    Stop recording and put the original methods back. Recorded data is kept until reset().
+    """
+    global counters
+    with _lock:
+        for (cls, attr), fn in _originals.items():
+            setattr(cls, attr, fn)
+        _originals.clear()
+        counters = None
+
+
+def enabled() -> bool:
+    return counters is not None
+
+
+def count(name: str, n: int = 1) -> None:
+    """
+    Add n to an algorithm counter (no-op while disabled)
+    """
+    if counters is not None:
+        with _lock:
+            # disable() may have run since the check above
+            if counters is not None:
+                counters[name] = counters.get(name, 0) + n
+
+
+def snapshot() -> dict:
+    """
+    Return copy of everything recorded so far:
+    {'buckets': BUCKETS, 'methods': {'Class.method': {'calls', 'total_seconds', 'max_seconds',
+    'histogram'}}, 'counters': {...}}; histogram[i] counts calls of at most BUCKETS[i]
+    seconds, the last entry counts slower calls
+    """
+    with _lock:
+        methods = {name: dict(stats, histogram=list(stats['histogram'])) for name, stats in _methods.items()}
+        return {'buckets': list(BUCKETS), 'methods': methods, 'counters': dict(counters or {})}
+
+
+def reset() -> None:
+    """
+    Forget everything recorded so far
+    """
+    with _lock:
+        _methods.clear()
+        if counters is not None:
+            counters.clear()
+
+
+def _record(name: str, seconds: float) -> None:
+    with _lock:
+        stats = _methods.get(name)
+        if stats is None:
+            stats = _methods[name] = {'calls': 0, 'total_seconds': 0.0, 'max_seconds': 0.0,
+                                      'histogram': [0] * (len(BUCKETS) + 1)}
+        stats['calls'] += 1
+        stats['total_seconds'] += seconds
+        stats['max_seconds'] = max(stats['max_seconds'], seconds)
+        bucket = 0
+        while bucket < len(BUCKETS) and seconds > BUCKETS[bucket]:
+            bucket += 1
+        stats['histogram'][bucket] += 1
+
+
+def _timed(name: str, fn):
+    """
+    Return fn wrapped to record its latency under name
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _record(name, time.perf_counter() - start)
+    return wrapper
@@ -4,8 +4,122 @@
 # Description: This file includes methods related to undirected graphs.
 import collections
 import heapq
+import warnings
 from collections import deque
 
+import instrumentation
+from d_graph import Batch, DirectedGraph
+
+class NeighborSet(dict):
+    """
+    Insertion-ordered set of neighbor names
+    - O(1) membership, add and discard
+    - printed like a list
+    """
+
+    __slots__ = ()
+
+    def __init__(self, neighbors=()):
+        super().__init__((v, None) for v in neighbors)
+
+    def add(self, v) -> None:
+        self[v] = None
+
+    def discard(self, v) -> None:
+        self.pop(v, None)
+
+    def remove(self, v) -> None:
+        del self[v]
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class DisjointSet:
+    """
+    Union-find over hashable items
+    - union by rank, path compression
+    - count is the number of disjoint sets
+    """
+
+    def __init__(self):
+        self.parent = {}
+        self.rank = {}
+        self.count = 0
+
+    def add(self, x) -> None:
+        """
+        Add x as a set of its own (no-op if already present)
+        """
+        if x not in self.parent:
+            self.parent[x] = x
+            self.rank[x] = 0
+            self.count += 1
+
+    def find(self, x):
+        """
+        Return representative of the set containing x
+        """
+        parent = self.parent
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        # point every vertex on the way directly at the root
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    def union(self, x, y) -> bool:
+        """
+        Merge the sets containing x and y. Return False if they were already the same set.
+        """
+        x, y = self.find(x), self.find(y)
+        if x == y:
+            return False
+        if self.rank[x] < self.rank[y]:
+            x, y = y, x
+        self.parent[y] = x
+        if self.rank[x] == self.rank[y]:
+            self.rank[x] += 1
+        self.count -= 1
+        return True
+
+
+class VertexIndex:
+    """
+    Two-way mapping between vertex names and dense integer ids 0, 1, 2, ...
+    - append-only: a name keeps its id once assigned
+    """
+
+    def __init__(self, names=()):
+        self.names = []
+        self.ids = {}
+        for name in names:
+            self.add(name)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def add(self, name) -> int:
+        """
+        Return id of name, assigning the next free id if it is new
+        """
+        i = self.ids.get(name)
+        if i is None:
+            i = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return i
+
+    def id_of(self, name) -> int:
+        return self.ids[name]
+
+    def name_of(self, i: int):
+        return self.names[i]
+
+
 class UndirectedGraph:
     """
     Class to implement undirected graph
@@ -15,6 +129,26 @@ class UndirectedGraph:
     - vertex names are strings
     """
 
+    # alphabetically sorted neighbors per vertex, created on first traversal
+    _sorted_cache = None
+    # DisjointSet of the vertices kept up to date by add_vertex/add_edge;
+    # None when it has to be rebuilt (before first use and after removals)
+    _components = None
+    # True once an edge joined two vertices already in the same component;
+    # only meaningful while _components is not None
+    _cycle = False
+    # number of edges, kept up to date by single-edge changes;
+    # None when it has to be recounted (after bulk changes)
+    _edge_count = 0
+    # bumped on every change, see version
+    _version = 0
+    # vertices whose NeighborSet is shared with a snapshot (None if none is shared)
+    _shared = None
+    # True for snapshots, see snapshot()
+    _read_only = False
+    # apply_batch() operations and their allowed tuple lengths
+    _BATCH_OPS = {'add_vertex': (2,), 'add_edge': (3,), 'remove_edge': (3,), 'remove_vertex': (2,)}
+
     def __init__(self, start_edges=None):
         """
         Store graph info as adjacency list
@@ -42,48 +176,170 @@ class UndirectedGraph:
 
     # ------------------------------------------------------------------ #
 
+    @classmethod
+    def from_edges(cls, edges, assume_unique=None):
+        """
+        Return new graph built from an iterable of (u, v) edges in bulk, see add_edges()
+        """
+        if assume_unique is not None:
+            warnings.warn('assume_unique is deprecated and ignored: repeated edges are merged '
+                          'at no extra cost and edges are always validated',
+                          DeprecationWarning, stacklevel=2)
+        graph = cls()
+        graph.add_edges(edges)
+        return graph
+
     def add_vertex(self, v: str) -> None:
         """
         Add new vertex to the graph
         """
-        self.adj_list.setdefault(v, [])
-        # self.adj_list[v] = []
-        # print(self)
-        
+        self._check_writable()
+        if v not in self.adj_list:
+            self.adj_list[v] = NeighborSet()
+            self._neighbors_changed(v)
+            self._version += 1
+            if self._components is not None:
+                self._components.add(v)
+
     def add_edge(self, u: str, v: str) -> None:
         """
         Add edge to the graph. Duplicated elements not allowed.
         """
+        self._check_writable()
         if u == v:
             return
-
-        # u and v exist. append the value if it does not exist.
-        elif u in self.adj_list and v in self.adj_list:
-            if u not in self.adj_list[v]:
-                self.adj_list[v].append(u)
-            if v not in self.adj_list[u]:
-                self.adj_list[u].append(v)
-
-        # empty case
-        elif u not in self.adj_list and v not in self.adj_list:
-            self.adj_list[u] = [v]
-            self.adj_list[v] = [u]
-
-        # only v exist. create v. append u
-        elif u not in self.adj_list and v in self.adj_list:
-            self.adj_list[u] = [v]
-            if u not in self.adj_list[v]:
-                self.adj_list[v].append(u)
-            else:
-                return
-        # only u exist. create u. append v
-        elif v not in self.adj_list and u in self.adj_list:
-            self.adj_list[v] = [u]
-            if v not in self.adj_list[u]:
-                self.adj_list[u].append(v)
+        elif u in self.adj_list and v in self.adj_list[u]:
+            return
+        self._neighbors_changed(u, v)
+        self._version += 1
+
+        # create missing vertices, then add each end to the other's neighbors
+        if u not in self.adj_list:
+            self.adj_list[u] = NeighborSet()
+        if v not in self.adj_list:
+            self.adj_list[v] = NeighborSet()
+        self._writable(u).add(v)
+        self._writable(v).add(u)
+        if self._edge_count is not None:
+            self._edge_count += 1
+        if self._components is not None:
+            self._components.add(u)
+            self._components.add(v)
+            # an edge inside one component closes a cycle
+            if not self._components.union(u, v):
+                self._cycle = True
+
+    def add_edges(self, edges, assume_unique=None) -> None:
+        """
+        Add (u, v) edges from any iterable in one pass, creating missing vertices.
+        Repeated edges are merged by the neighbor sets at no extra cost and loops are
+        always skipped, so assume_unique is deprecated and ignored.
+        Derived data (neighbor order, components) is rebuilt once on next use.
+        """
+        if assume_unique is not None:
+            warnings.warn('assume_unique is deprecated and ignored: repeated edges are merged '
+                          'at no extra cost and edges are always validated',
+                          DeprecationWarning, stacklevel=2)
+        self._check_writable()
+        adj_list = self.adj_list
+        shared = self._shared
+        for u, v in edges:
+            if u == v:
+                continue
+            u_neighbors = adj_list.get(u)
+            if u_neighbors is None:
+                u_neighbors = adj_list[u] = NeighborSet()
+            elif shared and u in shared:
+                u_neighbors = self._writable(u)
+            v_neighbors = adj_list.get(v)
+            if v_neighbors is None:
+                v_neighbors = adj_list[v] = NeighborSet()
+            elif shared and v in shared:
+                v_neighbors = self._writable(v)
+            u_neighbors[v] = None
+            v_neighbors[u] = None
+        self._version += 1
+        self._reset_caches()
+
+    def apply_batch(self, ops) -> None:
+        """
+        Apply a sequence of changes in one pass, in order: ('add_vertex', v),
+        ('add_edge', u, v), ('remove_edge', u, v), ('remove_vertex', v).
+        Invalid changes are skipped like in the single-change methods. Unknown
+        operations and operations of the wrong length raise ValueError before anything
+        is changed. Neighbor order of the touched vertices is rebuilt once on next use;
+        components and the edge count are kept up to date unless the batch removes
+        something, then components are rebuilt.
+        """
+        self._check_writable()
+        ops = list(ops)
+        for op in ops:
+            if len(op) not in self._BATCH_OPS.get(op[0] if op else None, ()):
+                raise ValueError(f'invalid batch operation: {op!r}')
+
+        self._version += 1
+        adj_list = self.adj_list
+        touched = set()
+        # edges are unioned into the components as they come, like add_edge();
+        # the first removal drops them for a lazy rebuild
+        components = self._components
+        edges = 0
+        for op in ops:
+            if op[0] == 'add_vertex':
+                if op[1] not in adj_list:
+                    adj_list[op[1]] = NeighborSet()
+                    if components is not None:
+                        components.add(op[1])
+            elif op[0] == 'add_edge':
+                u, v = op[1], op[2]
+                if u == v:
+                    continue
+                if u not in adj_list:
+                    adj_list[u] = NeighborSet()
+                if v not in adj_list:
+                    adj_list[v] = NeighborSet()
+                if v not in adj_list[u]:
+                    self._writable(u).add(v)
+                    self._writable(v).add(u)
+                    touched.update((u, v))
+                    edges += 1
+                    if components is not None:
+                        components.add(u)
+                        components.add(v)
+                        if not components.union(u, v):
+                            self._cycle = True
+            elif op[0] == 'remove_edge':
+                u, v = op[1], op[2]
+                if u in adj_list and v in adj_list[u]:
+                    self._writable(u).discard(v)
+                    self._writable(v).discard(u)
+                    touched.update((u, v))
+                    edges -= 1
+                    components = self._components = None
             else:
-                return
-
+                neighbors = adj_list.pop(op[1], None)
+                if neighbors is not None:
+                    for u in neighbors:
+                        self._writable(u).discard(op[1])
+                    touched.add(op[1])
+                    touched.update(neighbors)
+                    edges -= len(neighbors)
+                    components = self._components = None
+
+        # neighbor order of the touched vertices is dropped once for the whole batch
+        self._neighbors_changed(*touched)
+        if self._edge_count is not None:
+            self._edge_count += edges
+
+    def batch(self) -> Batch:
+        """
+        Return transaction collecting changes and applying them with apply_batch() on exit:
+            with graph.batch() as b:
+                b.add_edge('A', 'B')
+                b.remove_vertex('C')
+        Nothing is applied if the block raises.
+        """
+        return Batch(self)
 
     def remove_edge(self, v: str, u: str) -> None:
         """
@@ -91,40 +347,96 @@ class UndirectedGraph:
         do not exist in the graph, or if there is no edge between them, the
         method does nothing
         """
+        self._check_writable()
         if v == u:
             return
 
-        elif u not in self.adj_list and v not in self.adj_list:
-            return
-
-        elif u not in self.adj_list:
-            return
-
-        elif v not in self.adj_list:
+        elif u not in self.adj_list or v not in self.adj_list:
             return
 
-        else:
-            l = self.adj_list[u]
-            if v in self.adj_list[u]:
-                l.remove(v)
-            m = self.adj_list[v]
-            if u in self.adj_list[v]:
-                m.remove(u)
+        elif v in self.adj_list[u]:
+            self._neighbors_changed(u, v)
+            self._version += 1
+            self._writable(u).discard(v)
+            self._writable(v).discard(u)
+            self._components = None
+            if self._edge_count is not None:
+                self._edge_count -= 1
 
     def remove_vertex(self, v: str) -> None:
         """
         Remove vertex and all connected edges
         """
-        # delete the vertex
-        if v in self.adj_list.keys():
-            self.adj_list.pop(v)
-            # delete connected edges
-            for key in self.adj_list:
-                if v in self.adj_list[key]:
-                    l = self.adj_list[key]
-                    l.remove(v)
-        else:
+        self._check_writable()
+        if v not in self.adj_list:
             return
+        # delete the vertex, then only its own neighbors reference it
+        neighbors = self.adj_list.pop(v)
+        self._neighbors_changed(v, *neighbors)
+        self._version += 1
+        for u in neighbors:
+            self._writable(u).discard(v)
+        self._components = None
+        if self._edge_count is not None:
+            self._edge_count -= len(neighbors)
+
+    def remove_vertices(self, vertices) -> None:
+        """
+        Remove several vertices and all connected edges.
+        Edges between removed vertices are dropped without touching either end.
+        """
+        self._check_writable()
+        removed = {v for v in vertices if v in self.adj_list}
+        if removed:
+            self._components = None
+            self._version += 1
+        # edges to kept vertices are seen once, edges between removed vertices twice
+        outer = inner = 0
+        for v in removed:
+            neighbors = self.adj_list.pop(v)
+            self._neighbors_changed(v)
+            for u in neighbors:
+                if u not in removed:
+                    self._writable(u).discard(v)
+                    self._neighbors_changed(u)
+                    outer += 1
+                else:
+                    inner += 1
+        if self._edge_count is not None:
+            self._edge_count -= outer + inner // 2
+
+    def snapshot(self):
+        """
+        Return read-only copy of the graph that other threads can query without locks
+        while this graph keeps changing. Neighbor sets are shared with the snapshot and
+        copied here on their next change. Call it from the writer thread, not while
+        another change is running.
+        """
+        if self._read_only:
+            return self
+        snap = type(self)()
+        snap.adj_list = dict(self.adj_list)
+        self._shared = set(self.adj_list)
+        if self._sorted_cache is not None:
+            snap._sorted_cache = dict(self._sorted_cache)
+        snap._edge_count = self._edge_count
+        snap._version = self._version
+        snap._read_only = True
+        return snap
+
+    def _writable(self, v) -> NeighborSet:
+        """
+        Return neighbors of v, copying them first if a snapshot shares them
+        """
+        shared = self._shared
+        if shared and v in shared:
+            shared.discard(v)
+            self.adj_list[v] = NeighborSet(self.adj_list[v])
+        return self.adj_list[v]
+
+    def _check_writable(self) -> None:
+        if self._read_only:
+            raise TypeError('graph snapshot is read-only')
 
     def get_vertices(self) -> []:
         """
@@ -139,14 +451,35 @@ class UndirectedGraph:
         """
         Return list of edges in the graph (any order)
         """
-        keys_list = []
-        pair_list = []
+        return list(self.iter_edges())
+
+    def iter_edges(self):
+        """
+        Yield (u, v) edges in the order of get_edges() without building a list
+        """
+        # each edge is reported from the end seen first
+        done = set()
         for key in self.adj_list:
             for item in self.adj_list[key]:
-                if item not in keys_list:
-                    pair_list.append((key,item))
-            keys_list.append(key)
-        return pair_list
+                if item not in done:
+                    yield key, item
+            done.add(key)
+
+    @property
+    def edge_count(self) -> int:
+        """
+        Return number of edges in the graph
+        """
+        if self._edge_count is None:
+            self._edge_count = sum(len(neighbors) for neighbors in self.adj_list.values()) // 2
+        return self._edge_count
+
+    @property
+    def version(self) -> int:
+        """
+        Return number of changes made to the graph so far
+        """
+        return self._version
 
     def is_valid_path(self, path: []) -> bool:
         """
@@ -172,37 +505,47 @@ class UndirectedGraph:
                 return False
         return True
 
+    def _sorted_neighbors(self, v) -> []:
+        """
+        Return neighbors of v in alphabetical order (cached until they change, do not modify)
+        """
+        cache = self._sorted_cache
+        if cache is None:
+            cache = self._sorted_cache = {}
+        neighbors = cache.get(v)
+        if neighbors is None:
+            neighbors = cache[v] = sorted(self.adj_list[v])
+            if instrumentation.counters is not None:
+                instrumentation.count('neighbor_sorts')
+        return neighbors
+
+    def _reset_caches(self) -> None:
+        """
+        Drop all derived data; it is rebuilt on next use
+        """
+        self._sorted_cache = None
+        self._components = None
+        self._edge_count = None
+
+    def _neighbors_changed(self, *vertices) -> None:
+        """
+        Drop cached neighbor order of the given vertices
+        """
+        if self._sorted_cache is not None:
+            for v in vertices:
+                self._sorted_cache.pop(v, None)
+
     def dfs(self, v_start, v_end=None) -> []:
         """
         Return list of vertices visited during DFS search
         Vertices are picked in alphabetical order
         """
-        # Initialize an empty set of reachable vertices.
         visited = []
-        l = []
-        if v_start not in self.adj_list:
-            return visited
-
-        # Initialize an empty stack. Add vi to the stack.
-        stack = collections.deque([v_start])
-
-        while len(stack) != 0:
-            p = stack.pop()
-            # the vertex is stored to visited[]
-            if p not in visited:
-                visited.append(p)
-            # store elements in ascending order
-                for i in range(len(self.adj_list[p])):
-                    l.append(self.adj_list[p][i])
-                sorted_l = sorted(l)
-                # reset the list
-                l = []
-                # append sorted list to stack in backwards (so that it pops in ascending order)
-                for j in range(len(sorted_l) - 1, -1, -1):
-                    stack.append(sorted_l[j])
+        for v in self.iter_dfs(v_start):
+            visited.append(v)
             # return if it reached the v_end
-                if p == v_end:
-                    return visited
+            if v == v_end:
+                break
         return visited
 
     def bfs(self, v_start, v_end=None) -> []:
@@ -210,89 +553,196 @@ class UndirectedGraph:
         Return list of vertices visited during BFS search
         Vertices are picked in alphabetical order
         """
-        # Initialize an empty set of reachable vertices.
         visited = []
-        l = []
+        for v in self.iter_bfs(v_start):
+            visited.append(v)
+            # return if it reached the v_end
+            if v == v_end:
+                break
+        return visited
+
+    def iter_dfs(self, v_start, details=False):
+        """
+        Yield vertices as they are visited during DFS search (same order as dfs()).
+        With details=True yield (vertex, depth, parent) tuples instead; parent is None for v_start.
+        """
+        if v_start not in self.adj_list:
+            return
+        seen = set()
+
+        # Initialize an empty stack. Add vi to the stack.
+        stack = collections.deque([(v_start, 0, None)])
+
+        while len(stack) != 0:
+            p, depth, parent = stack.pop()
+            if p not in seen:
+                seen.add(p)
+                yield (p, depth, parent) if details else p
+                # append sorted neighbors to stack in backwards (so that it pops in alphabetical order)
+                neighbors = self._sorted_neighbors(p)
+                for j in range(len(neighbors) - 1, -1, -1):
+                    if neighbors[j] not in seen:
+                        stack.append((neighbors[j], depth + 1, p))
+
+    def iter_bfs(self, v_start, details=False):
+        """
+        Yield vertices as they are visited during BFS search (same order as bfs()).
+        With details=True yield (vertex, depth, parent) tuples instead; parent is None for v_start.
+        """
         if v_start not in self.adj_list:
-            return visited
-        # Initialize an empty queue. Add vi to the stack.
-        q = collections.deque([v_start])
+            return
+        queued = {v_start}
+        # Initialize an empty queue. Add vi to the queue.
+        q = collections.deque([(v_start, 0, None)])
 
         while len(q) != 0:
-            p = q.popleft()
-            # the vertex is stored to visited[]
-            if p not in visited:
-                visited.append(p)
-                # store elements in ascending order
-                for i in range(len(self.adj_list[p])):
-                    if self.adj_list[p][i] not in q:
-                        l.append(self.adj_list[p][i])
-                sorted_l = sorted(l)
-                # reset the list
-                l = []
-                # append sorted list to queue in ascending order)
-                for j in range(len(sorted_l)):
-                    q.append(sorted_l[j])
-                # return if it reached the v_end
-                if p == v_end:
-                    return visited
-        return visited
+            p, depth, parent = q.popleft()
+            yield (p, depth, parent) if details else p
+            # append sorted neighbors to queue in alphabetical order
+            for i in self._sorted_neighbors(p):
+                if i not in queued:
+                    queued.add(i)
+                    q.append((i, depth + 1, p))
+
+    def shortest_path(self, u, v):
+        """
+        Return (number of edges, list of vertices) of a shortest path from u to v,
+        (inf, []) if there is none.
+        Algorithm: bidirectional BFS, always expanding one full level of the smaller frontier.
+        """
+        if u not in self.adj_list or v not in self.adj_list:
+            return float('inf'), []
+        if u == v:
+            return 0, [u]
+
+        # index 0: search from u, index 1: search from v
+        depth = ({u: 0}, {v: 0})
+        parent = ({u: None}, {v: None})
+        frontier = ([u], [v])
+        while frontier[0] and frontier[1]:
+            side = 0 if len(frontier[0]) <= len(frontier[1]) else 1
+            other = 1 - side
+            level = []
+            meet = None
+            for x in frontier[side]:
+                for y in self.adj_list[x]:
+                    if y not in depth[side]:
+                        depth[side][y] = depth[side][x] + 1
+                        parent[side][y] = x
+                        level.append(y)
+                        # finish the level and keep the meeting point closest to the other end
+                        if y in depth[other] and (meet is None or depth[other][y] < depth[other][meet]):
+                            meet = y
+            if meet is not None:
+                path = [meet]
+                while parent[0][path[-1]] is not None:
+                    path.append(parent[0][path[-1]])
+                path.reverse()
+                while parent[1][path[-1]] is not None:
+                    path.append(parent[1][path[-1]])
+                return depth[0][meet] + depth[1][meet], path
+            frontier = (level, frontier[1]) if side == 0 else (frontier[0], level)
+        return float('inf'), []
 
     def count_connected_components(self):
         """
         Return number of connected components in the graph
         """
-        visited = []
-        count = 0
-
-        for i in range(len(self.adj_list)):
-            # transform vertex in list form
-            vertex_list = list(self.adj_list)
-            # visited vertex from dfs method is returned and add 1 to count
-            if vertex_list[i] not in visited:
-                vertices = self.dfs(vertex_list[i])
-                count += 1
-                # visited vertex is stored to visited
-                if len(vertices) > 0:
-                    for j in range(len(vertices)):
-                        if vertices[j] not in visited:
-                            visited.append(vertices[j])
-        return count
+        return self._connectivity().count
+
+    def connected(self, u, v) -> bool:
+        """
+        Return True if there is a path between vertices u and v, False otherwise
+        """
+        if u not in self.adj_list or v not in self.adj_list:
+            return False
+        components = self._connectivity()
+        return components.find(u) == components.find(v)
+
+    def _connectivity(self) -> DisjointSet:
+        """
+        Return DisjointSet of the connected components, rebuilding it from adj_list if needed
+        """
+        if self._components is None:
+            # point every vertex straight at the first vertex of its component (one DFS)
+            components = DisjointSet()
+            parent, rank = components.parent, components.rank
+            adj_list = self.adj_list
+            for root in adj_list:
+                if root in parent:
+                    continue
+                components.count += 1
+                parent[root] = root
+                rank[root] = 1
+                stack = [root]
+                while stack:
+                    for v in adj_list[stack.pop()]:
+                        if v not in parent:
+                            parent[v] = root
+                            rank[v] = 0
+                            stack.append(v)
+            # a forest has exactly V - C edges, any extra edge closes a cycle;
+            # set before _components so concurrent readers never see a stale flag
+            self._cycle = self.edge_count > len(adj_list) - components.count
+            self._components = components
+        return self._components
+
+    def save(self, path) -> None:
+        """
+        Write the graph to path as a binary snapshot (see graph_io); vertex names must be strings
+        """
+        from graph_io import save_graph
+        save_graph(self, path)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Return graph read from a snapshot written by save()
+        """
+        from graph_io import load_graph
+        graph = load_graph(path, mmap)
+        if not isinstance(graph, cls):
+            raise TypeError(f'{path} does not contain a {cls.__name__}')
+        return graph
+
+    def to_directed(self, storage='sparse'):
+        """
+        Return (DirectedGraph, VertexIndex) where every edge u-v becomes edges
+        id(u) -> id(v) and id(v) -> id(u) of weight 1; ids follow insertion order
+        """
+        index = VertexIndex(self.adj_list)
+        ids = index.ids
+        directed = DirectedGraph.with_storage(storage)
+        directed.add_vertices(len(index))
+        directed.add_edges((ids[u], ids[v], 1) for u in self.adj_list for v in self.adj_list[u])
+        return directed, index
+
+    @classmethod
+    def from_directed(cls, graph, names=None):
+        """
+        Return UndirectedGraph with an edge between the names of u and v for every
+        edge u -> v of a DirectedGraph. names maps ids to names (VertexIndex or list);
+        by default the integer ids are used as names.
+        """
+        if isinstance(names, VertexIndex):
+            names = names.names
+        elif names is None:
+            names = range(graph.v_count)
+        undirected = cls()
+        for u in range(graph.v_count):
+            undirected.add_vertex(names[u])
+        for u, v, _ in graph.get_edges():
+            undirected.add_edge(names[u], names[v])
+        return undirected
 
     def has_cycle(self):
         """
         Return True if graph contains a cycle, False otherwise
+        Algorithm: an edge whose ends are already in the same component closes a cycle.
+        Tracked as edges are added; after removals it is recomputed in one pass.
         """
-        # Initialize an empty set of reachable vertices.
-        visited = []
-
-        # Initialize an empty stack. Add vi to the stack.
-        vertices = list(self.adj_list.keys())
-
-        # To be sure we check every single vertex.
-        for m in range(len(vertices) - 1):
-            # check that vertex has neighbors
-            if len(self.adj_list[vertices[m]]) != 0:
-                stack = collections.deque(vertices[m])
-                # keep track of parents (at first we can pass whatever we want)
-                parent_s = collections.deque('a')
-
-                while len(stack) != 0:
-                    p = stack.pop()
-                    parent = parent_s.pop()
-                    # the vertex is stored to visited[]
-                    if p not in visited:
-                        visited.append(p)
-
-                        for i in range(len(self.adj_list[p])):
-                            if self.adj_list[p][i] not in visited:
-                                stack.append(self.adj_list[p][i])
-                                parent_s.append(p)
-                            # check if the destination is already where it's been visited
-                            # and also it is not parent
-                            elif self.adj_list[p][i] in visited and self.adj_list[p][i] != parent and self.adj_list[p][i] != 'a':
-                                return True
-        return False
+        self._connectivity()
+        return self._cycle
 
 
 if __name__ == '__main__':